@@ -1,93 +1,451 @@
 import sqlite3
+import os
+import re
+import sys
+import math
+import calendar
+from datetime import MINYEAR
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
+import matplotlib
+# Headless Linux sessions have no display, so skip GUI toolkit init entirely
+if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import os
-from datetime import datetime
+from matplotlib.figure import Figure
+try:
+    # Gives input() line editing and history where available
+    import readline  # noqa: F401
+except ImportError:
+    pass
+from itertools import chain, islice
+
+BULK_LOAD_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-200000;
+    PRAGMA mmap_size=268435456;
+'''
+
+# Connection settings changed by BULK_LOAD_PRAGMAS and restored after the
+# load. journal_mode is left out on purpose: WAL is stored in the database
+# file and is kept for later connections
+BULK_LOAD_RESTORED_PRAGMAS = ('synchronous', 'temp_store', 'cache_size', 'mmap_size')
+
+STOCK_COLUMNS = ['Date','Ticker','Open','High','Low','Close','Volume']
+
+STOCKS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        Date TEXT,
+        Ticker TEXT,
+        Open REAL,
+        High REAL,
+        Low REAL,
+        Close REAL,
+        Volume INTEGER,
+        PRIMARY KEY (Ticker, Date)
+    ) WITHOUT ROWID
+'''
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})', re.ASCII)
+
+# SQLite caps bound parameters per statement (999 before 3.32, 32766 since)
+MAX_SQL_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+ROWS_PER_INSERT = MAX_SQL_VARIABLES // len(STOCK_COLUMNS)
+
+# Bytes of CSV parsed per chunk, roughly 150k rows of stocks.csv
+CSV_BLOCK_SIZE = 8 << 20
+
+# Volume is read as text and cast per block in load_csv_blocks, so a
+# malformed value anywhere in the file reaches the coerce-and-skip
+# validation in clean_stock_data instead of failing the parse
+CSV_COLUMN_TYPES = {
+    'Date': pa.string(),
+    'Ticker': pa.string(),
+    'Open': pa.float64(),
+    'High': pa.float64(),
+    'Low': pa.float64(),
+    'Close': pa.float64(),
+    'Volume': pa.string(),
+}
+
+# SQLite's csv virtual table extension (csv.so / csv.dll), used to bulk load
+# clean CSV files without round-tripping rows through Python
+CSV_EXTENSION = 'csv'
+
+CSV_VTAB_DIRTY_ROWS_SQL = '''
+    SELECT EXISTS (
+        SELECT 1
+        FROM temp.stocks_csv
+        WHERE Date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+            OR Date GLOB '0000-*' OR date(julianday(Date)) IS NOT Date
+            OR trim(Ticker) = ''
+            OR Volume = '' OR Volume GLOB '*[^0-9]*'
+            OR Open GLOB '*[^0-9.]*' OR Open GLOB '*.*.*' OR Open = '.'
+            OR High GLOB '*[^0-9.]*' OR High GLOB '*.*.*' OR High = '.'
+            OR Low GLOB '*[^0-9.]*' OR Low GLOB '*.*.*' OR Low = '.'
+            OR Close GLOB '*[^0-9.]*' OR Close GLOB '*.*.*' OR Close = '.'
+    )
+'''
+
+CSV_VTAB_SELECT_SQL = '''
+    SELECT
+        Date,
+        Ticker,
+        CAST(NULLIF(Open, '') AS REAL),
+        CAST(NULLIF(High, '') AS REAL),
+        CAST(NULLIF(Low, '') AS REAL),
+        CAST(NULLIF(Close, '') AS REAL),
+        CAST(Volume AS INTEGER)
+    FROM temp.stocks_csv
+'''
+
+# Hot-path queries are kept as constants so sqlite3's statement cache
+# reuses the prepared statements across interactive loop iterations
+TICKER_EXISTS_SQL = 'SELECT 1 FROM stocks WHERE Ticker = ? LIMIT 1'
+DATE_EXISTS_SQL = 'SELECT 1 FROM stocks WHERE Date = ? LIMIT 1'
+
+TICKER_SUMMARY_SQL = '''
+    SELECT avg_close, avg_close_sq
+    FROM ticker_summary
+    WHERE Ticker = ?
+'''
+
+# Fallback for tickers added after ticker_summary was built
+TICKER_STATS_SQL = '''
+    SELECT AVG(Close), AVG(Close * Close)
+    FROM stocks
+    WHERE Ticker = ?
+'''
+
+TOP_VOLUME_SQL = '''
+    SELECT Date, Volume
+    FROM stocks
+    WHERE Ticker = ?
+    ORDER BY Volume DESC
+    LIMIT 5
+'''
+
+PRICE_INCREASE_SQL = '''
+    SELECT Ticker,Open,Close
+    FROM stocks
+    WHERE Date = ? AND Close > Open
+'''
+
+PRICE_TREND_SQL = '''
+    SELECT Date, Close
+    FROM stocks
+    WHERE Ticker = ?
+    ORDER BY Date
+'''
+
+MENU_TEXT = '''
+PricePoint: Stock Data Query Engine
+1. Run predefined queries
+2. Run custom SQL query
+3. Plot price trend
+4. Exit'''
+
+# Tickers known to exist in the database, filled by load_known_tickers
+_known_tickers = set()
 
 def connect_to_db():
     """Connect to SQLite database."""
     try:
-        conn = sqlite3.connect('stock_market.db')
+        conn = sqlite3.connect('stock_market.db', cached_statements=256)
         print("Connected to SQLite database 'stock_market.db'")
         return conn
     except sqlite3.Error as err:
         print(f"Error connecting to SQLite: {err}")
         exit(1)
 
-def setup_database(conn):
+def stocks_table_is_current(cursor):
+    """Check whether an existing stocks table uses the (Ticker, Date) WITHOUT ROWID layout."""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'stocks'")
+    row = cursor.fetchone()
+    if row is None:
+        return True
+    sql = ' '.join(row[0].split()).upper()
+    return 'PRIMARY KEY (TICKER, DATE)' in sql and sql.endswith('WITHOUT ROWID')
+
+def migrate_stocks_table(conn, cursor):
+    """Rebuild an older stocks table in the (Ticker, Date) WITHOUT ROWID layout."""
+    print("Migrating 'stocks' table to the (Ticker, Date) WITHOUT ROWID layout")
+    columns = ','.join(STOCK_COLUMNS)
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('DROP TABLE IF EXISTS stocks_new')
+        cursor.execute(STOCKS_TABLE_SQL.format(table='stocks_new'))
+        cursor.execute(f'INSERT OR IGNORE INTO stocks_new ({columns}) SELECT {columns} FROM stocks ORDER BY Ticker, Date')
+        # Dropping the old table also drops idx_ticker and idx_date, which
+        # the new primary key and covering indexes supersede
+        cursor.execute('DROP TABLE stocks')
+        cursor.execute('ALTER TABLE stocks_new RENAME TO stocks')
+        conn.commit()
+    except sqlite3.Error as err:
+        print(f"Error migrating 'stocks' table: {err}")
+        conn.rollback()
+        raise
+    # Reclaim the pages freed by the old table and its indexes
+    cursor.execute('VACUUM')
+
+def setup_table(conn):
     """Create stocks table if it doesn't exist."""
     cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS stocks (
-            Date TEXT,
-            Ticker TEXT,
-            Open REAL,
-            High REAL,
-            Low REAL,
-            Close REAL,
-            Volume INTEGER,
-            PRIMARY KEY (Date, Ticker)
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticker ON stocks (Ticker)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_date ON stocks (Date)')
+    if not stocks_table_is_current(cursor):
+        migrate_stocks_table(conn, cursor)
+    cursor.execute(STOCKS_TABLE_SQL.format(table='stocks'))
     conn.commit()
     print("Table 'stocks' created or already exists")
     return cursor
 
-def load_csv_data(conn, cursor,csv_file='stocks.csv'):
-    """Load data from CSV into SQLite with validation."""
-    if not os.path.exists(csv_file):
-        raise FileNotFoundError(f"{csv_file} not found. Please ensure the file is in the project directory.")
-    
-    df = pd.read_csv(csv_file)
-    
-    # Verify required columns
-    required_columns = ['Date','Ticker','Open','High','Low','Close','Volume']
-    if not all(col in df.columns for col in required_columns):
-        missing = [col for col in required_columns if col not in df.columns]
-        raise KeyError(f"Missing required columns: {missing}")
+def create_indexes(conn, cursor):
+    """Create secondary indexes once the bulk load has finished."""
+    # Ticker lookups are served by the (Ticker, Date) primary key
+    # Covers the per-date price increase query without touching the table
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_date_cover ON stocks (Date, Ticker, Open, Close)')
+    # Lets the top-volume query read the first rows in order instead of sorting
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticker_volume ON stocks (Ticker, Volume DESC, Date)')
+    conn.commit()
+
+def build_ticker_summary(conn, cursor):
+    """Precompute per-ticker Close aggregates into the ticker_summary table."""
+    cursor.execute('DROP TABLE IF EXISTS ticker_summary')
+    cursor.execute('''
+        CREATE TABLE ticker_summary (
+            Ticker TEXT PRIMARY KEY,
+            avg_close REAL,
+            avg_close_sq REAL,
+            n INTEGER
+        ) WITHOUT ROWID
+    ''')
+    refresh_ticker_summary(cursor)
+    conn.commit()
+
+def refresh_ticker_summary(cursor):
+    """Recompute ticker_summary from stocks within the current transaction."""
+    cursor.execute('DELETE FROM ticker_summary')
+    cursor.execute('''
+        INSERT INTO ticker_summary (Ticker, avg_close, avg_close_sq, n)
+        SELECT Ticker, AVG(Close), AVG(Close * Close), COUNT(*)
+        FROM stocks
+        GROUP BY Ticker
+    ''')
+
+def insert_prefix(or_ignore=True):
+    """Return the INSERT clause for stocks, skipping duplicate keys if or_ignore."""
+    verb = 'INSERT OR IGNORE' if or_ignore else 'INSERT'
+    return f"{verb} INTO stocks ({','.join(STOCK_COLUMNS)})"
+
+def build_insert_query(n_rows, or_ignore=True):
+    """Build a multi-row INSERT statement for n_rows rows of stock data."""
+    row_placeholder = '(' + ','.join('?' * len(STOCK_COLUMNS)) + ')'
+    return f"{insert_prefix(or_ignore)} VALUES " + ','.join([row_placeholder] * n_rows)
+
+def insert_rows(cursor, rows, or_ignore=True):
+    """Insert an iterable of row tuples, ROWS_PER_INSERT rows per statement."""
+    full_query = build_insert_query(ROWS_PER_INSERT, or_ignore)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, ROWS_PER_INSERT))
+        if not chunk:
+            break
+        query = full_query if len(chunk) == ROWS_PER_INSERT else build_insert_query(len(chunk), or_ignore)
+        cursor.execute(query, list(chain.from_iterable(chunk)))
+
+def clean_stock_data(df):
+    """Validate one chunk of CSV rows.
+
+    Returns the clean rows, the number of rows skipped for invalid volumes
+    and the number skipped for a missing Ticker or Date.
+    """
+    # Ticker and Date form the primary key, so rows without them are skipped
+    has_keys = pd.Series(True, index=df.index)
+    for col in ('Ticker', 'Date'):
+        has_keys &= df[col].notna() & (df[col].str.strip() != '')
+    missing_keys = int((~has_keys).sum())
+    if missing_keys:
+        df = df[has_keys]
     
-    # Validate for Volume column 
-    df['Volume'] = pd.to_numeric(df['Volume'],errors='coerce')
-    invalid_volumes = df[df['Volume'].isna() | (df['Volume'] < 0)]
-    if not invalid_volumes.empty:
-        print(f"Warning: Found {len(invalid_volumes)} rows with invalid volumes. Skipping these rows.")
-        df = df[df['Volume'].notna() & (df['Volume'] >= 0)]
+    # Validate for Volume column; an all-integer column needs no coercion
+    if not pd.api.types.is_integer_dtype(df['Volume']):
+        df['Volume'] = pd.to_numeric(df['Volume'],errors='coerce')
+    valid_volumes = df['Volume'].notna() & (df['Volume'] >= 0)
+    invalid_volumes = int((~valid_volumes).sum())
+    if invalid_volumes:
+        df = df[valid_volumes]
     
     # Convert Volume to integer
-    df['Volume'] = df['Volume'].astype('Int64')
+    df['Volume'] = df['Volume'].astype('int64')
     
-    # Ensure Date column is in YYYY-MM-DD format
-    df['Date'] = pd.to_datetime(df['Date'],errors='coerce').dt.strftime('%Y-%m-%d')
-    if df['Date'].isnull().any():
+    # Ensure Date column is in YYYY-MM-DD format. Dates already in that
+    # shape are only parsed to check they exist, skipping the reformat
+    if df['Date'].str.fullmatch(ISO_DATE_RE, na=False).all():
+        invalid_dates = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce').isna().any()
+    else:
+        df['Date'] = pd.to_datetime(df['Date'],errors='coerce').dt.strftime('%Y-%m-%d')
+        invalid_dates = df['Date'].isnull().any()
+    if invalid_dates:
         raise ValueError("Date column contains invalid or null dates. Please check the CSV data.")
+    return df, invalid_volumes, missing_keys
+
+def load_csv_virtual_table(conn, cursor, csv_file, sort_rows=False, or_ignore=True):
+    """Insert a clean CSV directly through SQLite's csv virtual table.
+
+    Returns False without inserting anything when the extension cannot be
+    loaded or the file needs the validation done by clean_stock_data.
+    """
+    try:
+        conn.enable_load_extension(True)
+    except AttributeError:
+        # Python's sqlite3 was built without extension loading
+        return False
+    try:
+        conn.load_extension(CSV_EXTENSION)
+        filename = csv_file.replace("'", "''")
+        cursor.execute(f"CREATE VIRTUAL TABLE temp.stocks_csv USING csv(filename='{filename}', header=YES)")
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.enable_load_extension(False)
+    
+    try:
+        cursor.execute('SELECT * FROM temp.stocks_csv LIMIT 0')
+        if not set(STOCK_COLUMNS) <= {col[0] for col in cursor.description}:
+            return False
+        # Non-ISO dates, missing tickers, missing or non-integer volumes and prices that are
+        # not plain decimals need the pyarrow/pandas path, which either
+        # normalises or rejects them
+        cursor.execute(CSV_VTAB_DIRTY_ROWS_SQL)
+        if cursor.fetchone()[0]:
+            return False
+        query = insert_prefix(or_ignore) + CSV_VTAB_SELECT_SQL
+        if sort_rows:
+            query += '    ORDER BY Ticker, Date\n'
+        cursor.execute(query)
+        return True
+    finally:
+        cursor.execute('DROP TABLE temp.stocks_csv')
+
+def load_csv_blocks(cursor, csv_file, sort_rows=False, or_ignore=True):
+    """Parse, validate and insert the CSV block by block.
+
+    Returns the numbers of rows skipped for invalid volumes and for a
+    missing Ticker or Date, as from clean_stock_data.
+    """
+    reader = pacsv.open_csv(
+        csv_file,
+        read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES),
+    )
     
-    insert_query = '''
-        INSERT OR IGNORE INTO stocks (Date,Ticker,Open,High,Low,Close,Volume)
-        VALUES (?,?,?,?,?,?,?)
-    '''
+    # Verify required columns
+    if not all(col in reader.schema.names for col in STOCK_COLUMNS):
+        missing = [col for col in STOCK_COLUMNS if col not in reader.schema.names]
+        raise KeyError(f"Missing required columns: {missing}")
+    
+    invalid_volumes = missing_keys = 0
+    # Validate and insert one block at a time so only a single chunk of
+    # the CSV is held in memory
+    for batch in reader:
+        table = pa.Table.from_batches([batch])
+        # Cast Volume in Arrow when the whole block is integral, with empty
+        # cells as nulls; otherwise leave the text for clean_stock_data to
+        # coerce and skip
+        volume = table['Volume']
+        try:
+            volume = pc.cast(pc.if_else(pc.equal(volume, ''), pa.scalar(None, pa.string()), volume), pa.int64())
+            table = table.set_column(table.schema.get_field_index('Volume'), 'Volume', volume)
+        except pa.ArrowInvalid:
+            pass
+        df, skipped_volumes, skipped_keys = clean_stock_data(table.to_pandas())
+        invalid_volumes += skipped_volumes
+        missing_keys += skipped_keys
+        if sort_rows:
+            df = df.sort_values(['Ticker', 'Date'], kind='stable')
+        # Stream rows straight off the columns without copying the frame
+        insert_rows(cursor, zip(*(df[col] for col in STOCK_COLUMNS)), or_ignore)
+    return invalid_volumes, missing_keys
+
+def insert_csv(conn, cursor, csv_file, sort_rows=False, or_ignore=True):
+    """Insert the CSV by the fastest available path, returning the skipped row counts of load_csv_blocks."""
+    if load_csv_virtual_table(conn, cursor, csv_file, sort_rows, or_ignore):
+        return 0, 0
+    return load_csv_blocks(cursor, csv_file, sort_rows, or_ignore)
+
+def load_csv_data(conn, cursor,csv_file='stocks.csv'):
+    """Load data from CSV into SQLite with validation."""
+    if not os.path.exists(csv_file):
+        raise FileNotFoundError(f"{csv_file} not found. Please ensure the file is in the project directory.")
+    
+    # Relax durability for the bulk load: WAL journal, no per-page fsync,
+    # in-memory temp storage and a ~200MB page cache
+    previous_pragmas = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in BULK_LOAD_RESTORED_PRAGMAS}
+    cursor.executescript(BULK_LOAD_PRAGMAS)
     try:
-        cursor.executemany(insert_query, df[['Date','Ticker','Open','High','Low','Close','Volume']].values.tolist())
+        cursor.execute('BEGIN IMMEDIATE')
+        changes_before = conn.total_changes
+        # A first load into an empty table skips the OR IGNORE conflict
+        # handling and inserts in (Ticker, Date) order, so primary key
+        # inserts append to the rightmost B-tree page
+        cursor.execute('SELECT 1 FROM stocks LIMIT 1')
+        first_load = cursor.fetchone() is None
+        try:
+            invalid_volumes, missing_keys = insert_csv(conn, cursor, csv_file, sort_rows=first_load, or_ignore=not first_load)
+        except sqlite3.IntegrityError as err:
+            # Only a repeated (Ticker, Date) pair in the CSV itself is retried;
+            # the primary key is the table's only uniqueness constraint
+            if not first_load or not str(err).startswith('UNIQUE constraint failed'):
+                raise
+            conn.rollback()
+            cursor.execute('BEGIN IMMEDIATE')
+            changes_before = conn.total_changes
+            invalid_volumes, missing_keys = insert_csv(conn, cursor, csv_file, sort_rows=True, or_ignore=True)
         conn.commit()
-        print(f"Inserted {cursor.rowcount} rows into 'stocks' table")
+        if missing_keys:
+            print(f"Warning: Found {missing_keys} rows with a missing Ticker or Date. Skipping these rows.")
+        if invalid_volumes:
+            print(f"Warning: Found {invalid_volumes} rows with invalid volumes. Skipping these rows.")
+        print(f"Inserted {conn.total_changes - changes_before} rows into 'stocks' table")
     except sqlite3.Error as err:
         print(f"Error inserting data: {err}")
         conn.rollback()
         raise
+    except (KeyError, ValueError):
+        # Missing columns, invalid dates or unparseable CSV values (pyarrow.ArrowInvalid)
+        conn.rollback()
+        raise
+    finally:
+        for name, value in previous_pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
 
 def validate_date(date_str):
     """Validate date format and return True if valid, False otherwise."""
-    try:
-        datetime.strptime(date_str,'%Y-%m-%d')
-        return True
-    except ValueError:
+    match = ISO_DATE_RE.fullmatch(date_str)
+    if not match:
         return False
+    year, month, day = map(int, match.groups())
+    return MINYEAR <= year and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+
+def load_known_tickers(cursor):
+    """Cache the set of tickers present in the database."""
+    cursor.execute('SELECT Ticker FROM ticker_summary')
+    _known_tickers.clear()
+    _known_tickers.update(row[0] for row in cursor.fetchall())
 
 def validate_ticker(cursor,ticker):
     """Check if ticker exists in the database."""
-    cursor.execute('SELECT COUNT(*) FROM stocks WHERE Ticker = ?', (ticker,))
-    return cursor.fetchone()[0] > 0
+    if ticker in _known_tickers:
+        return True
+    # Tickers added through custom queries are not in the cache yet
+    cursor.execute(TICKER_EXISTS_SQL, (ticker,))
+    if cursor.fetchone() is None:
+        return False
+    _known_tickers.add(ticker)
+    return True
 
 def plot_price_trend(cursor, ticker, save_plot=False):
     """Plot closing price trend for a ticker."""
@@ -95,33 +453,46 @@ def plot_price_trend(cursor, ticker, save_plot=False):
         print(f"No data found for ticker {ticker}")
         return
     
-    cursor.execute('''
-        SELECT Date, Close
-        FROM stocks
-        WHERE Ticker = ?
-        ORDER BY Date
-    ''',(ticker,))
+    cursor.execute(PRICE_TREND_SQL, (ticker,))
     data = cursor.fetchall()
     if not data:
         print(f"No data found for {ticker}")
         return
     
-    dates = [row[0] for row in data]
-    closes = [row[1] for row in data]
+    # Rows added through custom queries may carry non-ISO dates or
+    # non-numeric closes; such rows are dropped rather than failing the plot
+    dates = pd.to_datetime([row[0] for row in data], format='%Y-%m-%d', errors='coerce')
+    closes = pd.to_numeric(pd.Series([row[1] for row in data]), errors='coerce').to_numpy(np.float64)
+    valid_rows = dates.notna() & ~np.isnan(closes)
+    if not valid_rows.all():
+        print(f"Warning: Skipping {(~valid_rows).sum()} rows with invalid dates or closing prices for {ticker}")
+        if not valid_rows.any():
+            return
+        dates = dates[valid_rows]
+        closes = closes[valid_rows]
+    dates = dates.to_numpy()
     
-    plt.figure(figsize=(10, 5))
-    plt.plot(dates,closes,label=f'{ticker} Closing Price',color='#1f77b4')
-    plt.xlabel('Date')
-    plt.ylabel('Closing Price ($)')
-    plt.title(f'{ticker} Price Trend')
-    plt.legend()
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    # A saved plot is drawn on a bare Agg-backed Figure, bypassing pyplot's
+    # window management; only interactive plots go through the GUI backend
+    if save_plot:
+        fig = Figure(figsize=(10, 5))
+        ax = fig.subplots()
+    else:
+        fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(dates,closes,label=f'{ticker} Closing Price',color='#1f77b4')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Closing Price ($)')
+    ax.set_title(f'{ticker} Price Trend')
+    ax.legend()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     
     if save_plot:
-        plt.savefig(f'{ticker}_price_trend.png')
+        fig.savefig(f'{ticker}_price_trend.png')
         print(f"Plot saved as {ticker}_price_trend.png")
-    plt.show()
+    else:
+        plt.show()
+        plt.close(fig)
 
 def run_queries(cursor, ticker='AAPL', date='2023-01-01'):
     """Run predefined analysis queries."""
@@ -135,65 +506,47 @@ def run_queries(cursor, ticker='AAPL', date='2023-01-01'):
         return
     
     #Check if date exists in database
-    cursor.execute('SELECT COUNT(*) FROM stocks WHERE Date = ?', (date,))
-    if cursor.fetchone()[0] == 0:
+    cursor.execute(DATE_EXISTS_SQL, (date,))
+    if cursor.fetchone() is None:
         print(f"No data found for date {date}")
         return
 
-    #Average closing price
-    cursor.execute('''
-        SELECT AVG(Close)
-        FROM stocks
-        WHERE Ticker = ?
-    ''', (ticker,))
-    avg_close = cursor.fetchone()[0]
+    #Average closing price and E[Close^2], precomputed per ticker
+    cursor.execute(TICKER_SUMMARY_SQL, (ticker,))
+    summary = cursor.fetchone()
+    if summary is None:
+        cursor.execute(TICKER_STATS_SQL, (ticker,))
+        summary = cursor.fetchone()
+    avg_close, avg_close_sq = summary
     if avg_close is not None:
         print(f"\nAverage closing price for {ticker}: ${avg_close:.2f}")
     else:
         print(f"\nNo closing price data for {ticker}")
 
     #Top 5 high-volume days
-    cursor.execute('''
-        SELECT Date, Volume
-        FROM stocks
-        WHERE Ticker = ?
-        ORDER BY Volume DESC
-        LIMIT 5
-    ''', (ticker,))
+    cursor.execute(TOP_VOLUME_SQL, (ticker,))
     high_volume_days = cursor.fetchall()
-    print(f"\nTop 5 high-volume days for {ticker}:")
+    lines = [f"\nTop 5 high-volume days for {ticker}:"]
     if high_volume_days:
-        for day in high_volume_days:
-            print(f"Date: {day[0]}, Volume: {day[1]}")
+        lines.extend(f"Date: {day[0]}, Volume: {day[1]}" for day in high_volume_days)
     else:
-        print("No volume data found.")
+        lines.append("No volume data found.")
+    print("\n".join(lines))
 
     #Price increases on a specific date
-    cursor.execute('''
-        SELECT Ticker,Open,Close
-        FROM stocks
-        WHERE Date = ? AND Close > Open
-    ''', (date,))
+    cursor.execute(PRICE_INCREASE_SQL, (date,))
     price_increases = cursor.fetchall()
-    print(f"\nStocks with price increase on {date}:")
+    lines = [f"\nStocks with price increase on {date}:"]
     if price_increases:
-        for stock in price_increases:
-            print(f"Ticker: {stock[0]}, Open: ${stock[1]:.2f},Close: ${stock[2]:.2f}")
+        lines.extend(f"Ticker: {stock[0]}, Open: ${stock[1]:.2f},Close: ${stock[2]:.2f}" for stock in price_increases)
     else:
-        print("No stocks with price increase found.")
+        lines.append("No stocks with price increase found.")
+    print("\n".join(lines))
 
     # Query 4: Volatility (standard deviation of closing price)
-    cursor.execute('''
-        SELECT 
-            SQRT(
-                AVG((Close - sub.avg_close) * (Close - sub.avg_close))
-            ) as stddev
-        FROM stocks, 
-            (SELECT AVG(Close) as avg_close FROM stocks WHERE Ticker = ?) as sub
-        WHERE Ticker = ?
-    ''', (ticker, ticker))
-    volatility = cursor.fetchone()[0]
-    if volatility is not None:
+    # Var(X) = E[X^2] - E[X]^2, clamped against rounding below zero
+    if avg_close is not None:
+        volatility = math.sqrt(max(avg_close_sq - avg_close * avg_close, 0))
         print(f"\nVolatility (stddev of Close) for {ticker}: ${volatility:.2f}")
     else:
         print(f"\nNo volatility data for {ticker}")
@@ -208,47 +561,63 @@ def custom_query(cursor):
         cursor.execute(query)
         results = cursor.fetchall()
         if results:
-            print("\nQuery Results:")
-            for row in results:
-                print(row)
+            print("\nQuery Results:\n" + "\n".join(map(str, results)))
         else:
             print("No results returned or query executed successfully (e.g., INSERT/UPDATE).")
+        if cursor.rowcount > 0:
+            # Keep the precomputed aggregates and ticker cache in step with
+            # the modified rows; nothing here commits the user's change
+            refresh_ticker_summary(cursor)
+            load_known_tickers(cursor)
         return True
     except sqlite3.Error as err:
         print(f"Error executing query: {err}")
         return True
 
+def prompt_predefined_queries(cursor):
+    """Prompt for a ticker and date and run the predefined queries."""
+    ticker = input("Enter ticker (e.g., AAPL): ") or 'AAPL'
+    date = input("Enter date (YYYY-MM-DD, e.g., 2023-01-01): ") or '2023-01-01'
+    run_queries(cursor,ticker,date)
+    return True
+
+def prompt_price_trend(cursor):
+    """Prompt for a ticker and plot its price trend."""
+    ticker = input("Enter ticker for price trend (e.g., AAPL): ") or 'AAPL'
+    save_plot = input("Save plot to file? (y/n): ").lower() == 'y'
+    plot_price_trend(cursor,ticker,save_plot)
+    return True
+
+# Menu option -> handler(cursor); a handler returning False, or a None
+# handler, ends the interactive loop
+MENU_HANDLERS = {
+    '1': prompt_predefined_queries,
+    '2': custom_query,
+    '3': prompt_price_trend,
+    '4': None,
+}
+
 def main():
     conn = connect_to_db()
-    cursor = setup_database(conn)
+    cursor = setup_table(conn)
     
-    # Load data
+    # Load data, then build indexes in a single pass over the loaded table
     load_csv_data(conn, cursor)
+    create_indexes(conn, cursor)
+    build_ticker_summary(conn, cursor)
+    load_known_tickers(cursor)
     
     # Interactive query loop
     while True:
-        print("\nPricePoint: Stock Data Query Engine")
-        print("1. Run predefined queries")
-        print("2. Run custom SQL query")
-        print("3. Plot price trend")
-        print("4. Exit")
+        print(MENU_TEXT)
         choice = input("Select an option (1-4): ")
         
-        if choice == '1':
-            ticker = input("Enter ticker (e.g., AAPL): ") or 'AAPL'
-            date = input("Enter date (YYYY-MM-DD, e.g., 2023-01-01): ") or '2023-01-01'
-            run_queries(cursor,ticker,date)
-        elif choice == '2':
-            if not custom_query(cursor):
-                break
-        elif choice == '3':
-            ticker = input("Enter ticker for price trend (e.g., AAPL): ") or 'AAPL'
-            save_plot = input("Save plot to file? (y/n): ").lower() == 'y'
-            plot_price_trend(cursor,ticker,save_plot)
-        elif choice == '4':
-            break
-        else:
+        if choice not in MENU_HANDLERS:
             print("Invalid choice. Try again.")
+            continue
+        handler = MENU_HANDLERS[choice]
+        if handler is None or not handler(cursor):
+            break
     
     cursor.close()
     conn.close()
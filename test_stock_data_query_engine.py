@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import stock_data_query_engine as engine
+
+CSV_HEADER = 'Date,Open,High,Low,Close,Volume,Ticker\n'
+
+
+def make_rows(ticker, n_rows, volume='1000'):
+    """Return n_rows CSV lines of daily prices for ticker."""
+    return [f'2013-{1 + i // 28:02d}-{1 + i % 28:02d},1.5,2.5,1.0,2.0,{volume},{ticker}\n'
+            for i in range(n_rows)]
+
+
+class LoadCsvDataTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'stock_market.db'))
+        self.addCleanup(self.conn.close)
+        self.cursor = engine.setup_table(self.conn)
+
+    def write_csv(self, lines):
+        path = os.path.join(self.tmpdir.name, 'stocks.csv')
+        with open(path, 'w') as f:
+            f.write(CSV_HEADER + ''.join(lines))
+        return path
+
+    def test_invalid_volume_beyond_first_block_is_skipped(self):
+        lines = make_rows('AAA', 200)
+        lines[-1] = lines[-1].replace(',1000,', ',abc,')
+        lines[-2] = lines[-2].replace(',1000,', ',,')
+        lines[-3] = lines[-3].replace(',1000,', ',1.5e6,')
+        csv_file = self.write_csv(lines)
+
+        with mock.patch.object(engine, 'CSV_BLOCK_SIZE', 1024):
+            engine.load_csv_data(self.conn, self.cursor, csv_file)
+
+        self.cursor.execute('SELECT COUNT(*), MAX(Volume) FROM stocks')
+        self.assertEqual(self.cursor.fetchone(), (198, 1500000))
+
+    def test_calendar_invalid_date_is_rejected(self):
+        lines = make_rows('AAA', 3)
+        lines[1] = lines[1].replace('2013-01-02', '2013-02-30')
+        csv_file = self.write_csv(lines)
+
+        with self.assertRaises(ValueError):
+            engine.load_csv_data(self.conn, self.cursor, csv_file)
+
+        self.cursor.execute('SELECT COUNT(*) FROM stocks')
+        self.assertEqual(self.cursor.fetchone(), (0,))
+
+    def test_duplicate_key_in_csv_retries_keeping_first_row(self):
+        lines = make_rows('AAA', 3)
+        lines.append(lines[0].replace(',2.0,', ',9.0,'))
+        csv_file = self.write_csv(lines)
+
+        with mock.patch.object(engine, 'insert_csv', wraps=engine.insert_csv) as insert_csv:
+            engine.load_csv_data(self.conn, self.cursor, csv_file)
+        self.assertEqual(insert_csv.call_count, 2)
+
+        self.cursor.execute('SELECT COUNT(*), SUM(Close) FROM stocks')
+        self.assertEqual(self.cursor.fetchone(), (3, 6.0))
+
+    def test_rows_missing_ticker_or_date_are_skipped(self):
+        lines = make_rows('AAA', 4)
+        lines[1] = lines[1].replace(',AAA\n', ',\n')
+        lines[2] = lines[2].replace('2013-01-03', '')
+        csv_file = self.write_csv(lines)
+
+        with mock.patch('builtins.print') as print_:
+            engine.load_csv_data(self.conn, self.cursor, csv_file)
+        print_.assert_any_call("Warning: Found 2 rows with a missing Ticker or Date. Skipping these rows.")
+
+        self.cursor.execute('SELECT Date, Ticker FROM stocks')
+        self.assertEqual(self.cursor.fetchall(), [('2013-01-01', 'AAA'), ('2013-01-04', 'AAA')])
+
+    def test_connection_pragmas_are_restored(self):
+        pragmas = {name: self.cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in engine.BULK_LOAD_RESTORED_PRAGMAS}
+        csv_file = self.write_csv(make_rows('AAA', 3))
+
+        engine.load_csv_data(self.conn, self.cursor, csv_file)
+
+        for name, value in pragmas.items():
+            with self.subTest(pragma=name):
+                self.assertEqual(self.cursor.execute(f'PRAGMA {name}').fetchone()[0], value)
+        self.assertEqual(self.cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_csv_virtual_table_load(self):
+        try:
+            self.conn.enable_load_extension(True)
+            self.conn.load_extension(engine.CSV_EXTENSION)
+        except (AttributeError, sqlite3.Error):
+            self.skipTest("SQLite csv extension cannot be loaded")
+        finally:
+            if hasattr(self.conn, 'enable_load_extension'):
+                self.conn.enable_load_extension(False)
+        csv_file = self.write_csv(make_rows('BBB', 3) + make_rows('AAA', 2))
+
+        with mock.patch.object(engine, 'load_csv_blocks') as load_csv_blocks:
+            engine.load_csv_data(self.conn, self.cursor, csv_file)
+        load_csv_blocks.assert_not_called()
+
+        self.cursor.execute('SELECT Ticker, COUNT(*), SUM(Volume), SUM(Close) FROM stocks GROUP BY Ticker')
+        self.assertEqual(self.cursor.fetchall(), [('AAA', 2, 2000, 4.0), ('BBB', 3, 3000, 6.0)])
+
+
+class CsvVirtualTableDirtyRowsTest(unittest.TestCase):
+    """Checks CSV_VTAB_DIRTY_ROWS_SQL against a plain all-TEXT stand-in for temp.stocks_csv."""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        self.conn.execute('CREATE TEMP TABLE stocks_csv (Date TEXT, Open TEXT, High TEXT, Low TEXT, Close TEXT, Volume TEXT, Ticker TEXT)')
+
+    def is_dirty(self, **overrides):
+        row = dict(Date='2013-02-08', Open='15.07', High='15.12', Low='14.63', Close='14.75', Volume='8407500', Ticker='AAL')
+        row.update(overrides)
+        self.conn.execute('DELETE FROM temp.stocks_csv')
+        self.conn.execute('INSERT INTO temp.stocks_csv (Date, Open, High, Low, Close, Volume, Ticker) VALUES (?,?,?,?,?,?,?)',
+                          tuple(row.values()))
+        return bool(self.conn.execute(engine.CSV_VTAB_DIRTY_ROWS_SQL).fetchone()[0])
+
+    def test_clean_row(self):
+        self.assertFalse(self.is_dirty())
+        self.assertFalse(self.is_dirty(Low=''))
+
+    def test_rows_needing_validation(self):
+        for overrides in ({'Date': '2/8/2013'}, {'Date': '2013-02-30'}, {'Date': '2013-13-45'}, {'Date': '0000-01-01'}, {'Ticker': ''}, {'Volume': ''}, {'Volume': '1.5e6'}, {'Volume': '-1'},
+                          {'Open': 'abc'}, {'High': '1.2.3'}, {'Low': '.'}, {'Close': '-1.5'}):
+            with self.subTest(**overrides):
+                self.assertTrue(self.is_dirty(**overrides))
+
+
+class PlotPriceTrendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        self.cursor = engine.setup_table(self.conn)
+
+    def test_skips_rows_with_invalid_dates_or_closes(self):
+        self.cursor.executemany('INSERT INTO stocks VALUES (?,?,?,?,?,?,?)', [
+            ('2013-02-08', 'AAA', 1, 2, 0.5, 1.5, 10),
+            ('2013-02-11', 'AAA', 1, 2, 0.5, None, 10),
+            ('2013-02-12', 'AAA', 1, 2, 0.5, 'abc', 10),
+            ('2013-02-13', 'AAA', 1, 2, 0.5, '2.5', 10),
+            ('2020-1-1', 'AAA', 1, 2, 0.5, 1.5, 10),
+            ('foo', 'AAA', 1, 2, 0.5, 1.5, 10),
+        ])
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+        with mock.patch('builtins.print') as print_:
+            engine.plot_price_trend(self.cursor, 'AAA', save_plot=True)
+        print_.assert_any_call("Warning: Skipping 3 rows with invalid dates or closing prices for AAA")
+
+        self.assertTrue(os.path.exists('AAA_price_trend.png'))
+
+
+class CustomQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        self.cursor = engine.setup_table(self.conn)
+        self.cursor.execute("INSERT INTO stocks VALUES ('2013-02-08', 'AAA', 1, 2, 0.5, 1.0, 10)")
+        self.conn.commit()
+        engine.build_ticker_summary(self.conn, self.cursor)
+        engine.load_known_tickers(self.cursor)
+
+    def run_custom_query(self, query):
+        with mock.patch('builtins.input', return_value=query), mock.patch('builtins.print'):
+            self.assertTrue(engine.custom_query(self.cursor))
+
+    def test_data_changes_refresh_ticker_summary(self):
+        self.run_custom_query("INSERT INTO stocks VALUES ('2013-02-11', 'AAA', 1, 2, 0.5, 3.0, 10)")
+        self.run_custom_query("INSERT INTO stocks VALUES ('2013-02-08', 'BBB', 1, 2, 0.5, 5.0, 10)")
+
+        self.cursor.execute(engine.TICKER_SUMMARY_SQL, ('AAA',))
+        self.assertEqual(self.cursor.fetchone(), (2.0, 5.0))
+        self.assertIn('BBB', engine._known_tickers)
+        # The change stays uncommitted, as before
+        self.assertTrue(self.conn.in_transaction)
+
+
+class ValidateDateTest(unittest.TestCase):
+    def test_valid_dates(self):
+        for date in ('2023-01-01', '2024-02-29', '2023-12-31'):
+            with self.subTest(date=date):
+                self.assertTrue(engine.validate_date(date))
+
+    def test_invalid_dates(self):
+        for date in ('2023-02-29', '2023-13-01', '2023-00-10', '2023-04-31', '0000-01-01', '2023-1-1', 'foo',
+                     '2023-01-01\n', ' 2023-01-01', '\u0662\u0660\u0662\u0663-\u0660\u0661-\u0660\u0661'):
+            with self.subTest(date=date):
+                self.assertFalse(engine.validate_date(date))
+
+
+class SetupTableTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+
+    def test_migrates_rowid_table_keyed_on_date_ticker(self):
+        self.conn.executescript('''
+            CREATE TABLE stocks (
+                Date TEXT, Ticker TEXT, Open REAL, High REAL, Low REAL, Close REAL, Volume INTEGER,
+                PRIMARY KEY (Date, Ticker)
+            );
+            CREATE INDEX idx_ticker ON stocks (Ticker);
+            CREATE INDEX idx_date ON stocks (Date);
+            INSERT INTO stocks VALUES ('2013-02-11', 'AAA', 1, 2, 0.5, 1.5, 10);
+            INSERT INTO stocks VALUES ('2013-02-08', 'AAA', 1, 2, 0.5, 1.2, 20);
+            INSERT INTO stocks VALUES ('2013-02-08', 'BBB', 3, 4, 2.5, 3.5, 30);
+        ''')
+
+        cursor = engine.setup_table(self.conn)
+
+        self.assertTrue(engine.stocks_table_is_current(cursor))
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stocks'")
+        self.assertEqual(cursor.fetchall(), [])
+        cursor.execute('SELECT Date, Ticker, Close, Volume FROM stocks')
+        self.assertEqual(cursor.fetchall(), [
+            ('2013-02-08', 'AAA', 1.2, 20),
+            ('2013-02-11', 'AAA', 1.5, 10),
+            ('2013-02-08', 'BBB', 3.5, 30),
+        ])
+        cursor.execute('EXPLAIN QUERY PLAN ' + engine.PRICE_TREND_SQL, ('AAA',))
+        self.assertEqual([row[3] for row in cursor.fetchall()], ['SEARCH stocks USING PRIMARY KEY (Ticker=?)'])
+
+
+if __name__ == '__main__':
+    unittest.main()